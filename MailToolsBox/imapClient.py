@@ -1,119 +1,566 @@
 import imaplib
-import email
 import json
 import datetime
-from typing import List
+import binascii
+import contextlib
+import io
+import logging
+import os
+import quopri
+import re
+import ssl
+import tarfile
+import tempfile
+import time
+from email.errors import MessageError
+from email.header import Header, decode_header, make_header
+from email.parser import BytesHeaderParser, BytesParser
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from email.message import Message
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # optional speedup, see the "speedups" extra
+    orjson = None
+
+# Both paths produce orjson's compact, non-escaped output, so the bytes do not
+# depend on whether the speedup is installed.
+if orjson is not None:
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode('utf-8')
+else:
+    def _json_dumps(obj) -> str:
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+_UID_RE = re.compile(rb'UID (\d+)')
+_FETCH_START_RE = re.compile(rb'\d+ \(')
+_FETCH_TOKEN_RE = re.compile(rb'[()]|"(?:[^"\\]|\\.)*"|\{\d+\}|[^\s()"]+')
+_QUOTED_ESCAPE_RE = re.compile(rb'\\(.)')
+_SURROGATE_RE = re.compile('[\ud800-\udfff]')
+# FETCH item lists shared by the download paths.
+_FULL_MESSAGE = '(UID RFC822)'
+_FULL_MESSAGE_PEEK = '(UID BODY.PEEK[])'
+_HEADERS_ONLY = '(UID BODY.PEEK[HEADER])'
+_BODYSTRUCTURE = '(UID BODYSTRUCTURE)'
+_SUMMARY_FIELDS = '(UID BODY.PEEK[HEADER.FIELDS (FROM TO DATE SUBJECT)])'
+_TEXT_ENTRY = b"From: %s\nTo: %s\nDate: %s\nSubject: %s\n\nBody:\n\n%s\n\n"
+# Shared parsers: before Python 3.12 each fresh parser recompiled its header
+# regex, so reusing one instance saves that work per message. On 3.12+ it is
+# simply equivalent to email.message_from_bytes.
+_BYTES_PARSER = BytesParser()
+_HEADER_PARSER = BytesHeaderParser()
+
+
+def _check_batch_size(batch_size: int) -> None:
+    # Checked before any login or file is opened; _batched itself runs lazily.
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be at least 1, got {batch_size!r}")
+
+
+def _batched(items: Sequence[bytes], size: int) -> Iterator[Sequence[bytes]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _sequence_set(uids: Sequence[bytes]) -> bytes:
+    """Compress UIDs into an IMAP sequence set, coalescing runs (``1:5,7,9:12``)."""
+    numbers = sorted(int(uid) for uid in uids)
+    ranges = []
+    start = prev = numbers[0]
+    for number in numbers[1:]:
+        if number != prev + 1:
+            ranges.append((start, prev))
+            start = number
+        prev = number
+    ranges.append((start, prev))
+    return b','.join(
+        b'%d' % first if first == last else b'%d:%d' % (first, last)
+        for first, last in ranges)
+
+
+def _fetch_in_bulk(mail, uids: Sequence[bytes], message_parts: str = _FULL_MESSAGE,
+                   batch_size: int = 100) -> Iterator[Tuple[Optional[bytes], bytes]]:
+    """Yield ``(uid, raw_bytes)`` pairs, issuing one UID FETCH per batch of UIDs.
+
+    Batches are kept small enough to stay under the request-size limits enforced
+    by most servers.
+    """
+    for batch in _batched(uids, batch_size):
+        _, data = mail.uid('fetch', _sequence_set(batch), message_parts)
+        uid = payload = None
+        for item in data:
+            # Literal responses arrive as (envelope, payload) tuples, each followed
+            # by the rest of its FETCH item (usually just b')').
+            if isinstance(item, tuple):
+                if payload is not None:
+                    yield uid, payload
+                match = _UID_RE.search(item[0])
+                uid, payload = (match.group(1) if match else None), item[1]
+            elif payload is not None:
+                if uid is None:
+                    # Some servers echo the UID after the literal instead of before it.
+                    match = _UID_RE.search(item)
+                    uid = match.group(1) if match else None
+                yield uid, payload
+                uid = payload = None
+        if payload is not None:
+            yield uid, payload
+
+
+@lru_cache(maxsize=4)
+def _default_ssl_context(allow_invalid_certs: bool) -> ssl.SSLContext:
+    """Build the TLS context once per policy; SSLContext objects are safe to share."""
+    context = ssl.create_default_context()
+    if allow_invalid_certs:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def _decode_header_value(value) -> str:
+    """Turn a parsed header value into display text.
+
+    compat32 parsers return an ``email.header.Header`` rather than a str for raw
+    8-bit headers; its bytes are decoded here (as UTF-8 when undeclared) so the
+    cached decoder below only ever sees hashable text.
+    """
+    if value is None:
+        return ''
+    try:
+        if isinstance(value, Header):
+            value = ''.join(
+                _decode_text(chunk, None if charset == 'unknown-8bit' else charset)
+                if isinstance(chunk, bytes) else chunk
+                for chunk, charset in decode_header(value))
+        return _scrub_surrogates(_decode_header_text(str(value)))
+    except (TypeError, LookupError, UnicodeError, MessageError):
+        return ''
+
+
+@lru_cache(maxsize=4096)
+def _decode_header_text(value: str) -> str:
+    """Decode RFC 2047 encoded-words; cached since From/To values repeat across a mailbox."""
+    if '=?' not in value:
+        # Plain headers carry no encoded-words; most of a mailbox takes this path.
+        return value
+    try:
+        return str(make_header(decode_header(value)))
+    except (LookupError, UnicodeError, MessageError):
+        # Unknown charset or a malformed encoded-word: keep the raw header.
+        return value
+
+
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def _quote_search_string(value: str) -> str:
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _search_criteria(lookup: str = 'ALL', since: Optional[datetime.date] = None, from_addr: Optional[str] = None,
+                     subject: Optional[str] = None, unseen: bool = False
+                     ) -> Tuple[Optional[str], list, Optional[bytes]]:
+    """Build ``(charset, criteria, literal)`` for UID SEARCH so filtering happens on the server.
+
+    Messages that do not match are never fetched, which is far cheaper than
+    downloading everything and filtering in Python. Quoted strings must be 7-bit,
+    so a non-ASCII value is sent as a literal instead. imaplib allows only one
+    literal per command, so a second non-ASCII value raises ValueError.
+    """
+    criteria = [lookup]
+    if unseen:
+        criteria.append('UNSEEN')
+    if since is not None:
+        # IMAP dates always use English month names, whatever the locale says.
+        criteria += ['SINCE', f'{since.day}-{_MONTHS[since.month - 1]}-{since.year}']
+    charset = literal = None
+    literal_key = None
+    for key, value in (('FROM', from_addr), ('SUBJECT', subject)):
+        if not value:
+            continue
+        if value.isascii():
+            criteria += [key, _quote_search_string(value)]
+            continue
+        if literal is not None:
+            raise ValueError('Only one of from_addr and subject may contain non-ASCII characters')
+        charset = 'UTF-8'
+        literal_key, literal = key, value.encode('utf-8')
+    if literal_key is not None:
+        criteria.append(literal_key)
+    return charset, criteria, literal
+
+
+def _local_message_date(value) -> str:
+    """Render a Date header in local time, or '' when it is missing or unparseable."""
+    if not value:
+        return ''
+    try:
+        # str() also covers the Header objects compat32 returns for 8-bit values.
+        date = parsedate_to_datetime(str(value))
+    except (TypeError, ValueError, IndexError):
+        return ''
+    if date.tzinfo is None:
+        # "-0000" means UTC with no information about the sender's zone.
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    try:
+        return date.astimezone().strftime("%a, %d %b %Y %H:%M:%S")
+    except (OverflowError, OSError, ValueError):
+        # Out of range once shifted to local time, e.g. year 9999 at a negative offset.
+        return ''
+
+
+def _scrub_surrogates(text: str) -> str:
+    """Replace lone surrogates (utf-7 can decode to them); UTF-8 and orjson reject them."""
+    return _SURROGATE_RE.sub('\ufffd', text)
+
+
+def _decode_text(payload: bytes, charset: Optional[str]) -> str:
+    """Decode text using its declared charset, falling back to UTF-8."""
+    try:
+        text = payload.decode(charset or 'utf-8', errors='replace')
+    except LookupError:
+        text = payload.decode('utf-8', errors='replace')
+    return _scrub_surrogates(text)
+
+
+def _decode_payload(part) -> str:
+    return _decode_text(part.get_payload(decode=True) or b'', part.get_content_charset())
+
+
+def _decode_transfer(payload: bytes, encoding: Optional[bytes]) -> bytes:
+    """Undo a section's Content-Transfer-Encoding as reported by BODYSTRUCTURE."""
+    encoding = (encoding or b'').upper()
+    try:
+        if encoding == b'BASE64':
+            return binascii.a2b_base64(payload)
+        if encoding == b'QUOTED-PRINTABLE':
+            return quopri.decodestring(payload)
+    except binascii.Error:
+        pass
+    return payload
+
+
+def _parse_fetch_list(text: bytes, literals: Sequence[bytes]) -> list:
+    """Parse a parenthesised FETCH response into nested lists (``NIL`` becomes None)."""
+    pending = iter(literals)
+    stack: List[list] = [[]]
+    for token in _FETCH_TOKEN_RE.findall(text):
+        if token == b'(':
+            stack.append([])
+        elif token == b')':
+            if len(stack) > 1:
+                closed = stack.pop()
+                stack[-1].append(closed)
+        elif token[:1] == b'"':
+            stack[-1].append(_QUOTED_ESCAPE_RE.sub(rb'\1', token[1:-1]))
+        elif token[:1] == b'{':
+            stack[-1].append(next(pending, b''))
+        elif token.upper() == b'NIL':
+            stack[-1].append(None)
+        else:
+            stack[-1].append(token)
+    return stack[0]
+
+
+def _fetch_bodystructures(mail, uids: Sequence[bytes]) -> Iterator[Tuple[bytes, Optional[list]]]:
+    """Yield ``(uid, bodystructure)`` for ``uids`` using a single UID FETCH."""
+    _, data = mail.uid('fetch', _sequence_set(uids), _BODYSTRUCTURE)
+    responses: List[Tuple[bytearray, List[bytes]]] = []
+    for item in data:
+        text, literal = item if isinstance(item, tuple) else (item, None)
+        if not text:
+            continue
+        # Literal strings inside BODYSTRUCTURE split one response over several
+        # items; only the first one starts with "<seq> (".
+        if _FETCH_START_RE.match(text) or not responses:
+            responses.append((bytearray(), []))
+        responses[-1][0].extend(text)
+        if literal is not None:
+            responses[-1][1].append(literal)
+    for text, literals in responses:
+        parsed = _parse_fetch_list(bytes(text), literals)
+        attributes = parsed[1] if len(parsed) > 1 and isinstance(parsed[1], list) else []
+        fields = {key.upper(): value for key, value in zip(attributes[::2], attributes[1::2])
+                  if isinstance(key, bytes)}
+        if fields.get(b'UID'):
+            yield fields[b'UID'], fields.get(b'BODYSTRUCTURE')
+
+
+def _find_text_plain(structure: list, section: str = '') -> Optional[Tuple[str, Optional[str], Optional[bytes]]]:
+    """Return ``(section, charset, encoding)`` of the first text/plain leaf, if any."""
+    if structure and isinstance(structure[0], list):
+        # Multipart: child parts come first, followed by the subtype and extensions.
+        for index, child in enumerate(structure, 1):
+            if not isinstance(child, list):
+                break
+            found = _find_text_plain(child, f'{section}.{index}' if section else str(index))
+            if found:
+                return found
+        return None
+    if structure[0].lower() == b'text' and structure[1].lower() == b'plain':
+        params = structure[2] or []
+        charset = next((value.decode('ascii', 'replace') for key, value in zip(params[::2], params[1::2])
+                        if key.lower() == b'charset' and value), None)
+        # A non-multipart message exposes its body as section 1.
+        return section or '1', charset, structure[5]
+    if structure[0].lower() == b'message' and structure[1].lower() == b'rfc822':
+        # An attached message: its parts are numbered below this section (2.1, 2.2, ...)
+        # and a single-part body is its part 1.
+        section = section or '1'
+        body = structure[8]
+        return _find_text_plain(body, section if isinstance(body[0], list) else f'{section}.1')
+    return None
+
+
+def _fetch_plain_text(mail, uids: Sequence[bytes], batch_size: int = 100) -> Iterator[Tuple[Message, str]]:
+    """Yield ``(headers, body)`` for each message that has a text/plain part.
+
+    BODYSTRUCTURE locates the first text/plain section, so only the summary headers
+    and that section are downloaded and attachments stay on the server. Messages
+    whose structure cannot be read fall back to fetching the whole message, still
+    with ``BODY.PEEK`` so nothing is marked as seen.
+    """
+    for batch in _batched(uids, batch_size):
+        sections: Dict[bytes, Tuple[str, Optional[str], Optional[bytes]]] = {}
+        by_section: Dict[str, List[bytes]] = {}
+        full_fetch: List[bytes] = []
+        for uid, structure in _fetch_bodystructures(mail, batch):
+            try:
+                found = _find_text_plain(structure)
+            except (AttributeError, IndexError, TypeError):
+                full_fetch.append(uid)
+                continue
+            if found:
+                sections[uid] = found
+                by_section.setdefault(found[0], []).append(uid)
+
+        results: Dict[bytes, Tuple[Message, str]] = {}
+        skipped = set()
+        headers = dict(_fetch_in_bulk(mail, list(sections), _SUMMARY_FIELDS, batch_size))
+        for section, section_uids in by_section.items():
+            for uid, payload in _fetch_in_bulk(mail, section_uids, f'(UID BODY.PEEK[{section}])', batch_size):
+                if uid not in sections:
+                    continue
+                _, charset, encoding = sections[uid]
+                try:
+                    results[uid] = (_HEADER_PARSER.parsebytes(headers.get(uid, b'')),
+                                    _decode_text(_decode_transfer(payload, encoding), charset))
+                except (TypeError, ValueError, MessageError) as e:
+                    logger.warning("Skipping UID %s: %s", uid, e)
+                    skipped.add(uid)
+        for uid, raw_email in _fetch_in_bulk(mail, full_fetch, _FULL_MESSAGE_PEEK, batch_size):
+            try:
+                email_message = _BYTES_PARSER.parsebytes(raw_email)
+                for part in email_message.walk():
+                    if not part.is_multipart() and part.get_content_type() == "text/plain":
+                        results[uid] = (email_message, _decode_payload(part))
+                        break
+            except (TypeError, ValueError, MessageError) as e:
+                logger.warning("Skipping UID %s: %s", uid, e)
+
+        missing = [uid for uid in sections if uid not in results and uid not in skipped]
+        if missing:
+            # Expunged meanwhile, or the server answered NO for these UIDs.
+            logger.warning("No text/plain section returned for UIDs %s", b','.join(missing).decode())
+
+        for uid in batch:
+            if uid in results:
+                yield results[uid]
+
+
+@contextlib.contextmanager
+def _replace_on_success(file_name: str) -> Iterator:
+    """Write to a temp file beside ``file_name`` that replaces it only if the block succeeds."""
+    directory, base = os.path.split(file_name)
+    fd, temp_name = tempfile.mkstemp(prefix=f'.{base}.', suffix='.tmp', dir=directory or '.')
+    try:
+        with open(fd, 'w', encoding='utf-8') as f:
+            yield f
+        os.replace(temp_name, file_name)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp_name)
+        raise
 
 class ImapAgent:
-    def __init__(self, email_account, password, server_address):
+    def __init__(self, email_account, password, server_address, allow_invalid_certs=False):
         self.email_account = email_account
         self.password = password
         self.server_address = server_address
+        self.allow_invalid_certs = allow_invalid_certs
         self.mail = None
 
     def login_account(self):
-        self.mail = imaplib.IMAP4_SSL(self.server_address)
-        self.mail.login(self.email_account, self.password)
+        mail = imaplib.IMAP4_SSL(
+            self.server_address, ssl_context=_default_ssl_context(self.allow_invalid_certs))
+        try:
+            mail.login(self.email_account, self.password)
+        except Exception:
+            mail.shutdown()
+            raise
+        # Only a logged-in session is kept, so a failed LOGIN is retried next call.
+        self.mail = mail
 
-    def download_mail_text(self, path='', mailbox='INBOX'):
-        with open(f'{path}email.txt', 'w') as f:
-            self.mail.select(mailbox)
-            _, data = self.mail.uid('search', None, 'ALL')
-            uids = data[0].split()
-            for uid in uids:
-                _, email_data = self.mail.uid('fetch', uid, '(RFC822)')
-                raw_email = email_data[0][1]
-                raw_email_string = raw_email.decode('utf-8')
-                email_message = email.message_from_string(raw_email_string)
+    def logout_account(self):
+        if self.mail is None:
+            return
+        try:
+            self.mail.logout()
+        except (imaplib.IMAP4.abort, OSError):
+            # The server already dropped the connection; nothing left to log out of.
+            pass
+        finally:
+            self.mail = None
+
+    def _ensure_login(self):
+        # Reuse the session across calls; a TLS handshake plus LOGIN per download
+        # is slow and trips throttling on providers such as Gmail.
+        if self.mail is not None:
+            try:
+                self.mail.noop()
+            except (imaplib.IMAP4.abort, OSError):
+                # Dropped while idle (e.g. a server timeout between long jobs): reconnect.
+                self.logout_account()
+        if self.mail is None:
+            self.login_account()
+        return self.mail
+
+    def __enter__(self):
+        self._ensure_login()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.logout_account()
+
+    def _search(self, lookup='ALL', since=None, from_addr=None, subject=None, unseen=False) -> List[bytes]:
+        charset, criteria, literal = _search_criteria(lookup, since, from_addr, subject, unseen)
+        if charset is None:
+            _, data = self.mail.uid('search', None, *criteria)
+        else:
+            self.mail.literal = literal
+            _, data = self.mail.uid('search', 'CHARSET', charset, *criteria)
+        return data[0].split()
 
+    def download_mail_text(self, path='', mailbox='INBOX', batch_size=100, lookup='ALL',
+                           since=None, from_addr=None, subject=None, unseen=False):
+        _check_batch_size(batch_size)
+        # Each message is written as soon as it is parsed, so peak memory stays at
+        # one fetch batch rather than the whole mailbox.
+        with open(f'{path}email.txt', 'wb', buffering=1 << 20) as f:
+            self._ensure_login()
+            self.mail.select(mailbox)
+            uids = self._search(lookup, since, from_addr, subject, unseen)
+            for email_message, body in _fetch_plain_text(self.mail, uids, batch_size):
                 # Header Details
-                date_tuple = email.utils.parsedate_tz(email_message['Date'])
-                if date_tuple:
-                    local_date = datetime.datetime.fromtimestamp(
-                        email.utils.mktime_tz(date_tuple))
-                    local_message_date = local_date.strftime(
-                        "%a, %d %b %Y %H:%M:%S")
-                email_from = str(email.header.make_header(
-                    email.header.decode_header(email_message['From'])))
-                email_to = str(email.header.make_header(
-                    email.header.decode_header(email_message['To'])))
-                subject = str(email.header.make_header(
-                    email.header.decode_header(email_message['Subject'])))
-
-                # Body details
-                for part in email_message.walk():
-                    if part.get_content_type() == "text/plain":
-                        body = part.get_payload(decode=True)
-                        f.write(
-                            f"From: {email_from}\nTo: {email_to}\nDate: {local_message_date}\nSubject: {subject}\n\nBody:\n\n{body.decode('utf-8')}\n\n")
-        self.mail.close()
+                local_message_date = _local_message_date(email_message['Date'])
+                email_from = _decode_header_value(email_message['From'])
+                email_to = _decode_header_value(email_message['To'])
+                message_subject = _decode_header_value(email_message['Subject'])
 
-    import json
+                f.write(_TEXT_ENTRY % (
+                    email_from.encode('utf-8'), email_to.encode('utf-8'), local_message_date.encode('utf-8'),
+                    message_subject.encode('utf-8'), body.encode('utf-8')))
+        self.mail.close()
 
-    def download_mail_json(self, lookup: str = 'ALL', save: bool = False, path: str = '', file_name: str = 'mail.json') -> str:
+    def download_mail_json(self, lookup: str = 'ALL', save: bool = False, path: str = '', file_name: str = 'mail.json',
+                           batch_size: int = 100, since: Optional[datetime.date] = None,
+                           from_addr: Optional[str] = None, subject: Optional[str] = None,
+                           unseen: bool = False) -> str:
+        _check_batch_size(batch_size)
         save_json = save
-        self.login_account()
 
-        with imaplib.IMAP4_SSL(self.imap_server) as mail:
-            mail.login(self.username, self.password)
+        with contextlib.ExitStack() as stack:
+            # Records are serialised once, as they arrive, and streamed to the file;
+            # no list of dicts is kept around for a second full-size dumps() pass.
+            # A failed download leaves any previous file untouched.
+            out = stack.enter_context(_replace_on_success(f"{path}{file_name}")) if save_json else None
+            mail = self._ensure_login()
             mail.select("inbox")
-            result, data = mail.uid('search', None, lookup)  # (ALL/UNSEEN)
-            uids = data[0].split()
-            mail_items: List[dict] = []
-
-            for uid in uids:
-                result, email_data = mail.uid('fetch', uid, '(RFC822)')
-                raw_email = email_data[0][1]
-                raw_email_string = raw_email.decode('utf-8')
-                email_message = email.message_from_string(raw_email_string)
-                date_tuple = email.utils.parsedate_tz(email_message['Date'])
-                if date_tuple:
-                    local_date = datetime.datetime.fromtimestamp(
-                        email.utils.mktime_tz(date_tuple))
-                    local_message_date = f"{local_date.strftime('%a, %d %b %Y %H:%M:%S')}"
-                email_from = str(email.header.make_header(
-                    email.header.decode_header(email_message['From'])))
-                email_to = str(email.header.make_header(
-                    email.header.decode_header(email_message['To'])))
-                subject = str(email.header.make_header(
-                    email.header.decode_header(email_message['Subject'])))
-                body = ''
+            uids = self._search(lookup, since, from_addr, subject, unseen)  # (ALL/UNSEEN)
+            mail_items: List[str] = []
 
-                for part in email_message.walk():
-                    if part.get_content_type() == "text/plain":
-                        body = part.get_payload(decode=True).decode('utf-8')
-                        break
-                else:
-                    continue
+            for email_message, body in _fetch_plain_text(mail, uids, batch_size):
+                local_message_date = _local_message_date(email_message['Date'])
+                email_from = _decode_header_value(email_message['From'])
+                email_to = _decode_header_value(email_message['To'])
+                message_subject = _decode_header_value(email_message['Subject'])
 
-                mail_items.append({
+                item_json = _json_dumps({
                     'email_from': email_from,
                     'email_to': email_to,
                     'local_message_date': local_message_date,
-                    'subject': subject,
+                    'subject': message_subject,
                     'body': body,
                 })
+                if out is not None:
+                    out.write(',' if mail_items else '[')
+                    out.write(item_json)
+                mail_items.append(item_json)
 
             mail.close()
-            mail.logout()
 
-        mail_items_json = json.dumps(mail_items)
+            if out is not None:
+                out.write(']' if mail_items else '[]')
 
-        if save_json:
-            with open(f"{path}{file_name}", 'w') as f:
-                f.write(mail_items_json)
+        mail_items_json = '[' + ','.join(mail_items) + ']'
 
         return mail_items_json
 
-    def download_mail_msg(self, path='', lookup='ALL'):
-        self.login_account()
-        result, data = self.mail.uid('search', None, lookup)  # (ALL/UNSEEN)
-        for i, latest_email_uid in enumerate(data[0].split()):
-            result, email_data = self.mail.uid(
-                'fetch', latest_email_uid, '(RFC822)')
-            raw_email = email_data[0][1]
-            email_message = email.message_from_bytes(raw_email)
+    def download_mail_msg(self, path='', lookup='ALL', batch_size=100, mailbox='INBOX',
+                          since=None, from_addr=None, subject=None, unseen=False, archive=False):
+        """Save each matching message as ``email_<n>.msg``.
+
+        With ``archive=True`` the messages go into a single ``mail.tar`` instead, which
+        avoids one create/write/close cycle and directory entry per message.
+        """
+        _check_batch_size(batch_size)
+        self._ensure_login()
+        self.mail.select(mailbox)
+        uids = self._search(lookup, since, from_addr, subject, unseen)  # (ALL/UNSEEN)
+        messages = enumerate(_fetch_in_bulk(self.mail, uids, batch_size=batch_size))
+        # The server's bytes are already the canonical message; re-serialising a
+        # parsed copy would only re-fold headers and duplicate the body in memory.
+        if archive:
+            now = time.time()
+            with tarfile.open(f"{path}mail.tar", 'w', bufsize=1 << 20) as tar:
+                for i, (_, raw_email) in messages:
+                    info = tarfile.TarInfo(f"email_{i}.msg")
+                    info.size = len(raw_email)
+                    info.mtime = now
+                    tar.addfile(info, io.BytesIO(raw_email))
+            return
+        for i, (_, raw_email) in messages:
             file_name = f"{path}email_{i}.msg"
-            with open(file_name, 'w') as f:
-                f.write(email_message.as_string())
+            with open(file_name, 'wb') as f:
+                f.write(raw_email)
+
+    def fetch_headers(self, lookup: str = 'ALL', mailbox: str = 'INBOX', batch_size: int = 100,
+                      since: Optional[datetime.date] = None, from_addr: Optional[str] = None,
+                      subject: Optional[str] = None, unseen: bool = False) -> List[dict]:
+        """Return From/To/Date/Subject for matching messages without downloading bodies.
+
+        Only ``BODY.PEEK[HEADER]`` is requested, so large attachments never cross the
+        wire and messages are not marked as seen.
+        """
+        _check_batch_size(batch_size)
+        self._ensure_login()
+        self.mail.select(mailbox)
+        uids = self._search(lookup, since, from_addr, subject, unseen)
+        headers: List[dict] = []
+
+        for uid, raw_header in _fetch_in_bulk(self.mail, uids, _HEADERS_ONLY,
+                                              batch_size=batch_size):
+            email_message = _HEADER_PARSER.parsebytes(raw_header)
+            headers.append({
+                'uid': uid.decode() if uid else None,
+                'email_from': _decode_header_value(email_message['From']),
+                'email_to': _decode_header_value(email_message['To']),
+                'local_message_date': _local_message_date(email_message['Date']),
+                'subject': _decode_header_value(email_message['Subject']),
+            })
+
+        return headers
@@ -1,23 +1,91 @@
+import io
 import smtplib
+from itertools import chain, islice
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
+from email.encoders import encode_base64
+from email.generator import BytesGenerator
+from email.policy import SMTPUTF8
 from email.utils import COMMASPACE, formatdate
 from jinja2 import Template, Environment, FileSystemLoader, select_autoescape
-from typing import List, Optional, Iterable
+from typing import Dict, List, Optional, Iterable, Tuple
 from pathlib import Path
+from functools import lru_cache
 import logging
-from ssl import create_default_context
+from ssl import SSLContext, create_default_context
 from email_validator import validate_email, EmailNotValidError
 
 # Set up logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
+
+try:
+    import pybase64
+except ImportError:  # optional speedup, see the "speedups" extra
+    pybase64 = None
+
+if pybase64 is not None:
+    def _encode_base64(msg) -> None:
+        """email.encoders.encode_base64 backed by the SIMD pybase64 codec."""
+        msg.set_payload(pybase64.encodebytes(msg.get_payload(decode=True)).decode('ascii'))
+        msg['Content-Transfer-Encoding'] = 'base64'
+else:
+    _encode_base64 = encode_base64
+
+
+# How long send_bulk reuses one formatted Date header (and flattened message).
+_DATE_REFRESH_SECONDS = 60
+
+
+@lru_cache(maxsize=1)
+def _default_ssl_context() -> SSLContext:
+    """Load the system CA bundle once; shared by every sender, so never mutate it."""
+    return create_default_context()
+
+
+@lru_cache(maxsize=8192)
+def _validate_cached(email_address: str) -> str:
+    # Invalid addresses raise and are therefore never cached.
+    return validate_email(email_address, check_deliverability=False).normalized
+
+
+def _quit_quietly(server: smtplib.SMTP) -> None:
+    # QUIT on a connection the server already dropped raises; just close the socket.
+    try:
+        server.quit()
+    except (smtplib.SMTPException, OSError):
+        server.close()
+
+
+class _RateLimiter:
+    """Spaces calls to wait() at least 1/rate_per_sec apart, across threads."""
+
+    def __init__(self, rate_per_sec: float) -> None:
+        self._interval = 1.0 / rate_per_sec
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self._interval
+        if delay > 0:
+            time.sleep(delay)
 
 
 class EmailSender:
     """Modern email sender with sync/async support and enhanced features."""
 
+    __slots__ = (
+        'user_email', 'user_email_password', 'server_smtp_address', 'port',
+        'timeout', 'validate_emails', 'template_env', '_ssl_context',
+        '_smtp', '_smtp_tls'
+    )
+
     def __init__(
             self,
             user_email: str,
@@ -25,7 +93,8 @@ class EmailSender:
             user_email_password: str,
             port: int = 587,
             timeout: int = 10,
-            validate_emails: bool = True
+            validate_emails: bool = True,
+            ssl_context: Optional[SSLContext] = None
     ) -> None:
         self.user_email = self._validate_email(user_email) if validate_emails else user_email
         self.user_email_password = user_email_password
@@ -35,17 +104,31 @@ class EmailSender:
         self.validate_emails = validate_emails
         self.template_env = Environment(
             loader=FileSystemLoader('templates'),
-            autoescape=select_autoescape(['html', 'xml'])
+            autoescape=select_autoescape(['html', 'xml']),
+            # Compiled templates stay cached without a stat() per render.
+            auto_reload=False
         )
-        self.ssl_context = create_default_context()
+        self._ssl_context = ssl_context
+        self._smtp = None
+        self._smtp_tls = True
+
+    @property
+    def ssl_context(self) -> SSLContext:
+        """TLS context for STARTTLS, created on first access so it can be tuned per sender."""
+        if self._ssl_context is None:
+            self._ssl_context = create_default_context()
+        return self._ssl_context
+
+    @ssl_context.setter
+    def ssl_context(self, context: SSLContext) -> None:
+        self._ssl_context = context
 
     def _validate_email(self, email_address: str) -> str:
         """Validate and normalize email address using email-validator."""
         try:
-            result = validate_email(email_address, check_deliverability=False)
-            return result.normalized
+            return _validate_cached(email_address)
         except EmailNotValidError as e:
-            logger.error(f"Invalid email address: {email_address}")
+            logger.error("Invalid email address: %s", email_address)
             raise ValueError(f"Invalid email address: {email_address}") from e
 
     def _create_base_message(
@@ -53,45 +136,61 @@ class EmailSender:
             subject: str,
             recipients: Iterable[str],
             cc: Optional[Iterable[str]] = None,
-            bcc: Optional[Iterable[str]] = None
+            bcc: Optional[Iterable[str]] = None,
+            date: Optional[str] = None
     ) -> MIMEMultipart:
         """Create MIME message with proper headers."""
         msg = MIMEMultipart()
         msg['From'] = self.user_email
         msg['Subject'] = subject
-        msg['Date'] = formatdate(localtime=True)
-
-        if self.validate_emails:
-            recipients = [self._validate_email(r) for r in recipients]
+        msg['Date'] = date or formatdate(localtime=True)
 
-        msg['To'] = COMMASPACE.join(recipients)
+        msg['To'] = self._join_addresses(recipients)
 
         if cc:
-            validated_cc = [self._validate_email(c) for c in cc] if self.validate_emails else cc
-            msg['Cc'] = COMMASPACE.join(validated_cc)
+            msg['Cc'] = self._join_addresses(cc)
 
         if bcc:
-            validated_bcc = [self._validate_email(b) for b in bcc] if self.validate_emails else bcc
-            msg['Bcc'] = COMMASPACE.join(validated_bcc)
+            msg['Bcc'] = self._join_addresses(bcc)
 
         return msg
 
-    def _add_attachments(self, msg: MIMEMultipart, attachments: Iterable[str]) -> None:
-        """Add multiple attachments to the message."""
+    def _join_addresses(self, addresses: Iterable[str]) -> str:
+        """Validate (if enabled), de-duplicate and join addresses for a header in one pass."""
+        if self.validate_emails:
+            return COMMASPACE.join(dict.fromkeys(map(self._validate_email, addresses)))
+        addresses = dict.fromkeys(addresses)
+        for email_address in addresses:
+            # Unvalidated input still must not inject headers (e.g. "a@x\r\nBcc: ...").
+            if '\r' in email_address or '\n' in email_address:
+                raise ValueError(f"Invalid email address: {email_address!r}")
+        return COMMASPACE.join(addresses)
+
+    def _build_attachment_parts(self, attachments: Iterable[str]) -> List[MIMEApplication]:
+        """Read and encode each attachment into a MIME part."""
+        parts = []
         for file_path in attachments:
             path = Path(file_path)
-            if not path.exists():
-                logger.warning(f"Attachment not found: {file_path}")
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                logger.warning("Attachment not found: %s", file_path)
                 continue
 
-            with open(path, 'rb') as f:
-                part = MIMEApplication(
-                    f.read(),
-                    Name=path.name
-                )
+            part = MIMEApplication(
+                data,
+                _encoder=_encode_base64,
+                Name=path.name
+            )
             part['Content-Disposition'] = f'attachment; filename="{path.name}"'
-            msg.attach(part)
+            parts.append(part)
+        return parts
 
+    def _add_attachments(self, msg: MIMEMultipart, attachments: Iterable[str]) -> None:
+        """Add multiple attachments to the message."""
+        for part in self._build_attachment_parts(attachments):
+            msg.attach(part)
 
     def send(
             self,
@@ -104,7 +203,14 @@ class EmailSender:
             use_tls: bool = True,
             html: bool = False
     ) -> None:
-        """Synchronous email sending with improved error handling."""
+        """Synchronous email sending with improved error handling.
+
+        While a session from open() is active the message goes over it, so the
+        TLS mode is the one given to open(); a different ``use_tls`` raises ValueError.
+        """
+        if self._smtp is not None and use_tls != self._smtp_tls:
+            raise ValueError(
+                f"use_tls={use_tls} does not match the open session (use_tls={self._smtp_tls})")
         msg = self._create_base_message(subject, recipients, cc, bcc)
         msg.attach(MIMEText(message_body, 'html' if html else 'plain'))
 
@@ -112,17 +218,259 @@ class EmailSender:
             self._add_attachments(msg, attachments)
 
         try:
-            with smtplib.SMTP(self.server_smtp_address, self.port, timeout=self.timeout) as server:
-                if use_tls:
-                    server.starttls(context=self.ssl_context)
-                server.login(self.user_email, self.user_email_password)
-                server.send_message(msg)
+            if self._smtp is not None:
+                self._send_on_session(msg)
+            else:
+                with self._connect(use_tls) as server:
+                    server.send_message(msg)
         except smtplib.SMTPException as e:
-            logger.error(f"SMTP error occurred: {str(e)}")
+            logger.error("SMTP error occurred: %s", e)
             raise
         except Exception as e:
-            logger.error(f"Unexpected error: {str(e)}")
+            logger.error("Unexpected error: %s", e)
+            raise
+
+    def open(self, use_tls: bool = True) -> 'EmailSender':
+        """Keep one authenticated connection open for subsequent send() calls.
+
+        The session's TLS mode is fixed here; send() calls made on it inherit it.
+        """
+        if self._smtp is None:
+            self._smtp = self._connect(use_tls)
+            self._smtp_tls = use_tls
+        return self
+
+    def close(self) -> None:
+        """Close the connection opened by open(), if any."""
+        if self._smtp is not None:
+            _quit_quietly(self._smtp)
+            self._smtp = None
+
+    def __enter__(self) -> 'EmailSender':
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _send_on_session(self, msg: MIMEMultipart) -> None:
+        # The server may drop an idle session; reconnect once and retry.
+        try:
+            self._smtp.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            self._smtp.close()
+            self._smtp = self._connect(self._smtp_tls)
+            self._smtp.send_message(msg)
+
+    def _connect(self, use_tls: bool = True) -> smtplib.SMTP:
+        """Open an authenticated SMTP connection."""
+        server = smtplib.SMTP(self.server_smtp_address, self.port, timeout=self.timeout)
+        try:
+            if use_tls:
+                # Until ssl_context is touched, the shared default avoids reloading the CA bundle.
+                server.starttls(context=self._ssl_context or _default_ssl_context())
+            server.login(self.user_email, self.user_email_password)
+        except Exception:
+            server.close()
             raise
+        return server
+
+    def send_bulk(
+            self,
+            recipients: Iterable[str],
+            subject: str,
+            message_body: str,
+            attachments: Optional[Iterable[str]] = None,
+            use_tls: bool = True,
+            html: bool = False,
+            messages_per_connection: int = 100,
+            concurrency: int = 1,
+            rate_per_sec: Optional[float] = None,
+            batch_size: int = 1
+    ) -> Dict[str, str]:
+        """Send an individual copy of the message to each recipient.
+
+        One authenticated connection is reused for up to
+        ``messages_per_connection`` messages, then recycled to stay under
+        server-side limits; a dropped connection is reopened once and the
+        message retried. With ``concurrency`` > 1 the recipients are split
+        across that many worker threads, each with its own connection.
+        ``rate_per_sec`` caps the combined send rate of all workers.
+        A ``batch_size`` above 1 sends one copy per batch of that many
+        recipients (undisclosed To). Connection recycling and the rate
+        limit then count transactions rather than individual recipients.
+        If a connection cannot be (re)opened, sending stops and every
+        recipient not yet sent is reported as failed.
+        Returns failed recipients mapped to the error.
+        """
+        for name, value in (('messages_per_connection', messages_per_connection),
+                            ('concurrency', concurrency), ('batch_size', batch_size)):
+            if value < 1:
+                raise ValueError(f"{name} must be at least 1, got {value!r}")
+        if rate_per_sec is not None and rate_per_sec <= 0:
+            raise ValueError(f"rate_per_sec must be positive, got {rate_per_sec!r}")
+        # Encoded once and shared: parts are not mutated when a message is flattened.
+        parts = self._build_attachment_parts(attachments) if attachments else []
+        limiter = _RateLimiter(rate_per_sec) if rate_per_sec is not None else None
+        # Materialized once, in order, without duplicates (nobody gets two copies).
+        recipients = list(dict.fromkeys(recipients))
+        if concurrency == 1:
+            return self._send_many_on_connection(
+                recipients, subject, message_body, parts, use_tls, html, messages_per_connection,
+                limiter, batch_size
+            )
+
+        failed = {}
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [
+                executor.submit(
+                    self._send_many_on_connection, recipients[i::concurrency],
+                    subject, message_body, parts, use_tls, html, messages_per_connection,
+                    limiter, batch_size
+                )
+                for i in range(min(concurrency, len(recipients)))
+            ]
+            for future in futures:
+                failed.update(future.result())
+        return failed
+
+    def _send_many_on_connection(
+            self,
+            recipients: Iterable[str],
+            subject: str,
+            message_body: str,
+            parts: List[MIMEApplication],
+            use_tls: bool,
+            html: bool,
+            messages_per_connection: int,
+            limiter: Optional[_RateLimiter] = None,
+            batch_size: int = 1
+    ) -> Dict[str, str]:
+        """Send the message in batches of recipients over a single recycled connection."""
+        failed = {}
+        server = None
+        sent_on_connection = 0
+        shared = None
+        dated_at = 0.0
+        recipients = iter(recipients)
+        try:
+            while True:
+                batch = list(islice(recipients, batch_size))
+                if not batch:
+                    break
+                # Normalized address -> address as given, for reporting failures.
+                to_addrs = {}
+                for recipient in batch:
+                    try:
+                        to_addrs[self._join_addresses([recipient])] = recipient
+                    except ValueError as e:
+                        logger.error("Failed to send to %s: %s", recipient, e)
+                        failed[recipient] = str(e)
+                if not to_addrs:
+                    continue
+                if server is not None and sent_on_connection >= messages_per_connection:
+                    _quit_quietly(server)
+                    server = None
+                if limiter is not None:
+                    limiter.wait()
+                # A dropped connection is reopened and the batch retried once.
+                for _ in range(2):
+                    if server is None:
+                        try:
+                            server = self._connect(use_tls)
+                        except OSError as e:  # includes every SMTPException
+                            # Unreachable server or failed login: stop and report who was not sent.
+                            unsent = list(chain(to_addrs.values(), recipients))
+                            logger.error("Could not connect, %d recipients not sent: %s", len(unsent), e)
+                            failed.update(dict.fromkeys(unsent, str(e)))
+                            return failed
+                        sent_on_connection = 0
+                    if shared is None or time.monotonic() - dated_at >= _DATE_REFRESH_SECONDS:
+                        # One Date header, and so one flattened body, for up to a minute of sending.
+                        date = formatdate(localtime=True)
+                        shared = self._flatten_shared(subject, message_body, parts, html, date)
+                        dated_at = time.monotonic()
+                    try:
+                        refused = self._send_prepared(
+                            server, list(to_addrs), shared, subject, message_body, parts, html, date)
+                        sent_on_connection += 1
+                        break
+                    except smtplib.SMTPServerDisconnected as e:
+                        refused = dict.fromkeys(to_addrs, e)
+                        server.close()
+                        server = None
+                    except smtplib.SMTPRecipientsRefused as e:
+                        refused = e.recipients
+                        break
+                    except smtplib.SMTPException as e:
+                        refused = dict.fromkeys(to_addrs, e)
+                        break
+                    except OSError as e:
+                        # A socket error mid-transaction leaves the connection unusable.
+                        refused = dict.fromkeys(to_addrs, e)
+                        server.close()
+                        server = None
+                        break
+                for to, error in refused.items():
+                    recipient = to_addrs.get(to, to)
+                    logger.error("Failed to send to %s: %s", recipient, error)
+                    failed[recipient] = str(error)
+        finally:
+            if server is not None:
+                _quit_quietly(server)
+        return failed
+
+    def _flatten_shared(
+            self,
+            subject: str,
+            message_body: str,
+            parts: List[MIMEApplication],
+            html: bool,
+            date: str
+    ) -> bytes:
+        """Serialize a bulk message without its To header, ready for SMTP."""
+        msg = self._create_base_message(subject, (), date=date)
+        del msg['To']
+        msg.attach(MIMEText(message_body, 'html' if html else 'plain'))
+        for part in parts:
+            msg.attach(part)
+        with io.BytesIO() as buffer:
+            BytesGenerator(buffer).flatten(msg, linesep='\r\n')
+            return buffer.getvalue()
+
+    def _send_prepared(
+            self,
+            server: smtplib.SMTP,
+            to_addrs: List[str],
+            shared: bytes,
+            subject: str,
+            message_body: str,
+            parts: List[MIMEApplication],
+            html: bool,
+            date: str
+    ) -> Dict[str, Tuple[int, bytes]]:
+        """Send the shared bytes with a To header prepended; returns refused recipients.
+
+        A batch of several recipients gets an undisclosed To header so the
+        addresses are not revealed to each other.
+        """
+        to = to_addrs[0] if len(to_addrs) == 1 else 'undisclosed-recipients:;'
+        if all(map(str.isascii, to_addrs)) and self.user_email.isascii():
+            return server.sendmail(
+                self.user_email, to_addrs, b'To: ' + to.encode('ascii') + b'\r\n' + shared)
+        # Internationalized addresses need SMTPUTF8 and raw UTF-8 headers (RFC 6531/6532).
+        if not server.has_extn('smtputf8'):
+            raise smtplib.SMTPNotSupportedError(
+                'Internationalized address but the server does not support SMTPUTF8')
+        msg = self._create_base_message(subject, (), date=date)
+        msg.replace_header('To', to)
+        msg.attach(MIMEText(message_body, 'html' if html else 'plain'))
+        for part in parts:
+            msg.attach(part)
+        with io.BytesIO() as buffer:
+            BytesGenerator(buffer, policy=SMTPUTF8).flatten(msg, linesep='\r\n')
+            raw = buffer.getvalue()
+        return server.sendmail(
+            self.user_email, to_addrs, raw, mail_options=('SMTPUTF8', 'BODY=8BITMIME'))
 
     def send_template(
             self,
@@ -139,12 +487,35 @@ class EmailSender:
         html_content = template.render(**context)
         self.send([recipient], subject, html_content, cc=cc, attachments=attachments, use_tls=use_tls, html=True)
 
+    def send_bulk_template(
+            self,
+            recipients: Iterable[str],
+            subject: str,
+            template_name: str,
+            context: dict,
+            attachments: Optional[Iterable[str]] = None,
+            use_tls: bool = True,
+            messages_per_connection: int = 100,
+            concurrency: int = 1,
+            rate_per_sec: Optional[float] = None,
+            batch_size: int = 1
+    ) -> Dict[str, str]:
+        """Render a template once and send it to every recipient via send_bulk."""
+        html_content = self.template_env.get_template(template_name).render(**context)
+        return self.send_bulk(
+            recipients, subject, html_content, attachments=attachments, use_tls=use_tls, html=True,
+            messages_per_connection=messages_per_connection, concurrency=concurrency,
+            rate_per_sec=rate_per_sec, batch_size=batch_size
+        )
+
 
 
 # Backward compatibility layer
 class SendAgent(EmailSender):
     """Legacy compatibility layer maintaining original interface."""
 
+    __slots__ = ()
+
     def send_mail(
             self,
             recipient_email: Optional[List[str]],
@@ -170,7 +541,7 @@ class SendAgent(EmailSender):
         )
 
         if server_quit:
-            self.server.quit()
+            self.close()
 
     def send_mail_with_template(
             self,
@@ -196,11 +567,13 @@ class SendAgent(EmailSender):
         )
 
         if server_quit:
-            self.server.quit()
+            self.close()
 
 
 # Example usage
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
     sender = EmailSender(
         user_email="your@email.com",
         server_smtp_address="smtp.example.com",
@@ -0,0 +1,204 @@
+import imaplib
+import re
+import smtplib
+import threading
+from typing import Dict, NamedTuple
+
+import pytest
+
+from MailToolsBox.imapClient import ImapAgent
+
+
+def _expand(uid_set: bytes):
+    for token in uid_set.split(b','):
+        first, _, last = token.partition(b':')
+        for number in range(int(first), int(last or first) + 1):
+            yield b'%d' % number
+
+
+class StructuredMessage(NamedTuple):
+    """A message served with an explicit BODYSTRUCTURE and section payloads.
+
+    ``structure`` is the BODYSTRUCTURE list as bytes, or as imaplib-style chunks
+    split at literals (``[(text, literal), ..., tail]``); ``sections`` maps a
+    section number such as ``'1.1'`` to its raw (still transfer-encoded) bytes.
+    """
+    raw: bytes
+    structure: object
+    sections: Dict[str, bytes]
+
+
+_PLAIN_STRUCTURE = b'("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "8BIT" %d 1)'
+_PEEK_SECTION_RE = re.compile(r'BODY\.PEEK\[([^\]]*)\]')
+
+
+class FakeIMAP:
+    """Stand-in for an IMAP4_SSL session.
+
+    Plain ``bytes`` messages are served as single-part text/plain;
+    ``StructuredMessage`` entries report their own structure and sections.
+    """
+
+    def __init__(self, messages):
+        self.messages = {b'%d' % uid: message for uid, message in enumerate(messages, 1)}
+        self.commands = []
+
+    def select(self, mailbox='INBOX'):
+        return 'OK', [b'%d' % len(self.messages)]
+
+    def noop(self):
+        return 'OK', [b'NOOP completed']
+
+    def close(self):
+        pass
+
+    def logout(self):
+        pass
+
+    def uid(self, command, *args):
+        self.commands.append((command,) + args)
+        if command == 'search':
+            return 'OK', [b' '.join(self.messages)]
+        uid_set, spec = args
+        data = []
+        for uid in _expand(uid_set):
+            message = self.messages.get(uid)
+            if message is None:
+                continue
+            raw = message.raw if isinstance(message, StructuredMessage) else message
+            header, _, body = raw.partition(b'\n\n')
+            if 'BODYSTRUCTURE' in spec:
+                if isinstance(message, StructuredMessage):
+                    chunks = [message.structure] if isinstance(message.structure, bytes) else message.structure
+                else:
+                    chunks = [_PLAIN_STRUCTURE % len(body)]
+                for i, chunk in enumerate(chunks):
+                    text, literal = chunk if isinstance(chunk, tuple) else (chunk, None)
+                    if i == 0:
+                        text = b'%s (UID %s BODYSTRUCTURE %s' % (uid, uid, text)
+                    if i == len(chunks) - 1:
+                        text += b')'
+                    data.append(text if literal is None else (text, literal))
+                continue
+            section = _PEEK_SECTION_RE.search(spec)
+            if 'HEADER' in spec:
+                name, payload = b'BODY[HEADER]', header + b'\n\n'
+            elif section is None:
+                name, payload = b'RFC822', raw
+            elif not section.group(1):
+                name, payload = b'BODY[]', raw
+            else:
+                name = b'BODY[%s]' % section.group(1).encode()
+                if isinstance(message, StructuredMessage):
+                    payload = message.sections.get(section.group(1))
+                else:
+                    payload = body if section.group(1) == '1' else None
+                if payload is None:
+                    continue
+            data.append((b'%s (UID %s %s {%d}' % (uid, uid, name, len(payload)), payload))
+            data.append(b')')
+        return 'OK', data
+
+
+@pytest.fixture
+def imap_logins(monkeypatch):
+    """Patch IMAP4_SSL with FakeIMAP connections serving ``state['messages']``.
+
+    LOGIN fails while ``state['fail']`` is set.
+    """
+    state = {'fail': False, 'connections': 0, 'messages': []}
+
+    class Connection(FakeIMAP):
+        def __init__(self, host, ssl_context=None):
+            super().__init__(state['messages'])
+            state['connections'] += 1
+
+        def login(self, user, password):
+            if state['fail']:
+                raise imaplib.IMAP4.error('AUTHENTICATIONFAILED')
+
+        def shutdown(self):
+            pass
+
+    monkeypatch.setattr(imaplib, 'IMAP4_SSL', Connection)
+    return state
+
+
+@pytest.fixture
+def imap_agent():
+    """Return a factory for an ImapAgent already "logged in" to a FakeIMAP."""
+    def make(*messages):
+        agent = ImapAgent('me@example.com', 'secret', 'imap.example.com')
+        agent.mail = FakeIMAP(messages)
+        return agent
+    return make
+
+
+class FakeSMTP:
+    """Stand-in for smtplib.SMTP recording every transaction in ``sent``.
+
+    ``errors`` maps a recipient to the exception its transaction raises,
+    ``refused`` maps recipients rejected at RCPT TO to their ``(code, message)``
+    and ``extensions`` lists the ESMTP extensions the server advertises. Once
+    ``max_connections`` connections were made, further ones are refused.
+    """
+
+    sent = []
+    errors = {}
+    refused = {}
+    extensions = ()
+    connections = 0
+    max_connections = None
+
+    _lock = threading.Lock()  # send_bulk(concurrency=...) connects from several threads
+
+    def __init__(self, host, port, timeout=None):
+        with self._lock:
+            if self.max_connections is not None and type(self).connections >= self.max_connections:
+                raise ConnectionRefusedError(111, 'Connection refused')
+            type(self).connections += 1
+        self.closed = False
+
+    def starttls(self, context=None):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def has_extn(self, name):
+        return name.lower() in self.extensions
+
+    def sendmail(self, from_addr, to_addrs, msg, mail_options=(), rcpt_options=()):
+        for to in to_addrs:
+            if to in self.errors:
+                raise self.errors[to]
+        # Like smtplib: refused recipients are returned unless nobody was accepted.
+        refused = {to: self.refused[to] for to in to_addrs if to in self.refused}
+        if len(refused) == len(to_addrs):
+            raise smtplib.SMTPRecipientsRefused(refused)
+        self.sent.append((from_addr, [to for to in to_addrs if to not in refused], msg, tuple(mail_options)))
+        return refused
+
+    def send_message(self, msg, from_addr=None, to_addrs=None):
+        self.sent.append((from_addr, to_addrs, msg, ()))
+        return {}
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.quit()
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    """Patch smtplib.SMTP with a fresh FakeSMTP class and return it."""
+    server = type('FakeSMTP', (FakeSMTP,), {'sent': [], 'errors': {}, 'refused': {}, 'extensions': (), 'connections': 0})
+    monkeypatch.setattr(smtplib, 'SMTP', server)
+    return server
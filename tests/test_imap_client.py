@@ -0,0 +1,348 @@
+import base64
+import imaplib
+import json
+import logging
+import tarfile
+from email.header import Header
+from email.parser import BytesParser
+
+import pytest
+
+from MailToolsBox.imapClient import (
+    ImapAgent, _decode_header_value, _decode_text, _decode_transfer, _fetch_in_bulk, _find_text_plain,
+    _parse_fetch_list, _search_criteria, _sequence_set,
+)
+
+from conftest import StructuredMessage
+
+
+def test_decode_header_value_encoded_word():
+    assert _decode_header_value('=?utf-8?b?SsO2cmc=?= <j@example.com>') == 'Jörg <j@example.com>'
+
+
+def test_decode_header_value_missing():
+    assert _decode_header_value(None) == ''
+
+
+def test_decode_header_value_raw_8bit_header_object():
+    message = BytesParser().parsebytes('Subject: Grüße\n\nbody\n'.encode('utf-8'))
+    assert isinstance(message['Subject'], Header)
+    assert _decode_header_value(message['Subject']) == 'Grüße'
+
+
+def test_decode_header_value_unknown_charset_keeps_raw():
+    assert _decode_header_value('=?x-bogus?q?abc?=') == '=?x-bogus?q?abc?='
+
+
+RAW_UTF8_MESSAGE = (
+    'From: Jörg <j@example.com>\n'
+    'To: you@example.com\n'
+    'Date: Wed, 20 Sep 2023 12:00:00 +0000\n'
+    'Subject: Grüße\n'
+    '\n'
+    'Hallo Welt\n'
+).encode('utf-8')
+
+
+def test_fetch_headers_raw_utf8_header(imap_agent):
+    agent = imap_agent(RAW_UTF8_MESSAGE, b'From: a@example.com\nSubject: plain\n\nbody\n')
+    headers = agent.fetch_headers()
+    assert [h['subject'] for h in headers] == ['Grüße', 'plain']
+    assert headers[0]['email_from'] == 'Jörg <j@example.com>'
+    assert headers[0]['uid'] == '1'
+
+
+def test_fetch_headers_raw_8bit_date_is_blank(imap_agent):
+    agent = imap_agent('Date: Mittwoch, 20. Sep 2023 ü\nSubject: s\n\nbody\n'.encode('utf-8'))
+    assert agent.fetch_headers()[0]['local_message_date'] == ''
+
+
+def test_download_mail_json_raw_utf8_header(imap_agent):
+    agent = imap_agent(RAW_UTF8_MESSAGE)
+    records = json.loads(agent.download_mail_json())
+    assert records[0]['subject'] == 'Grüße'
+    assert records[0]['email_from'] == 'Jörg <j@example.com>'
+    assert records[0]['body'].strip() == 'Hallo Welt'
+
+
+def test_download_mail_text_raw_utf8_header(imap_agent, tmp_path):
+    agent = imap_agent(RAW_UTF8_MESSAGE)
+    agent.download_mail_text(path=f'{tmp_path}/')
+    text = (tmp_path / 'email.txt').read_text(encoding='utf-8')
+    assert 'Subject: Grüße\n' in text
+    assert 'Hallo Welt' in text
+
+
+def test_decoded_text_has_no_lone_surrogates():
+    # Python's utf-7 codec decodes "+2D8-" to a lone surrogate.
+    assert _decode_text(b'a+2D8-b', 'utf-7') == 'a�b'
+    assert _decode_header_value('=?utf-7?q?a+2D8-b?=') == 'a�b'
+
+
+def test_search_criteria_sends_non_ascii_value_as_literal():
+    charset, criteria, literal = _search_criteria(from_addr='a@example.com', subject='Grüße')
+    assert charset == 'UTF-8'
+    assert criteria == ['ALL', 'FROM', '"a@example.com"', 'SUBJECT']
+    assert literal == 'Grüße'.encode('utf-8')
+
+
+def test_search_criteria_rejects_two_non_ascii_values():
+    with pytest.raises(ValueError):
+        _search_criteria(from_addr='Jörg', subject='Grüße')
+
+
+def test_download_mail_json_is_compact_and_unescaped(imap_agent):
+    agent = imap_agent(RAW_UTF8_MESSAGE, RAW_UTF8_MESSAGE)
+    text = agent.download_mail_json()
+    assert text.startswith('[{"email_from":"Jörg <j@example.com>",')
+    assert '},{' in text
+    assert text == json.dumps(json.loads(text), separators=(',', ':'), ensure_ascii=False)
+
+
+class CannedIMAP:
+    """Answers every UID FETCH with the next canned imaplib-style data list."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.fetched = []
+
+    def uid(self, command, uid_set, spec):
+        self.fetched.append(uid_set)
+        return 'OK', self.responses.pop(0)
+
+
+@pytest.mark.parametrize('uids, expected', [
+    ([b'7'], b'7'),
+    ([b'1', b'2', b'3', b'5', b'9', b'10', b'11'], b'1:3,5,9:11'),
+    ([b'12', b'3', b'11', b'4', b'10'], b'3:4,10:12'),
+    ([b'2', b'4', b'6'], b'2,4,6'),
+])
+def test_sequence_set_compresses_runs(uids, expected):
+    assert _sequence_set(uids) == expected
+
+
+def test_fetch_in_bulk_pairs_literals_with_uids():
+    mail = CannedIMAP([
+        (b'1 (UID 10 RFC822 {5}', b'first'), b')',
+        (b'2 (UID 11 RFC822 {6}', b'second'), b')',
+        (b'3 (UID 12 RFC822 {5}', b'third'), b')',
+    ])
+    assert list(_fetch_in_bulk(mail, [b'10', b'11', b'12'])) == [
+        (b'10', b'first'), (b'11', b'second'), (b'12', b'third')]
+    assert mail.fetched == [b'10:12']
+
+
+def test_fetch_in_bulk_missing_and_trailing_uids():
+    mail = CannedIMAP([
+        # UID echoed after the literal, no UID at all, then no closing item.
+        (b'1 (RFC822 {1}', b'a'), b' UID 4)',
+        (b'2 (RFC822 {1}', b'b'), b')',
+        (b'3 (UID 6 RFC822 {1}', b'c'),
+    ])
+    assert list(_fetch_in_bulk(mail, [b'4', b'5', b'6'])) == [(b'4', b'a'), (None, b'b'), (b'6', b'c')]
+
+
+def test_fetch_in_bulk_one_fetch_per_batch():
+    mail = CannedIMAP(
+        [(b'1 (UID 1 RFC822 {1}', b'a'), b')', (b'2 (UID 2 RFC822 {1}', b'b'), b')'],
+        [(b'3 (UID 5 RFC822 {1}', b'c'), b')'],
+    )
+    assert [uid for uid, _ in _fetch_in_bulk(mail, [b'1', b'2', b'5'], batch_size=2)] == [b'1', b'2', b'5']
+    assert mail.fetched == [b'1:2', b'5']
+
+
+def test_parse_fetch_list_nested_quoted_nil_and_literals():
+    text = b'1 (UID 3 BODYSTRUCTURE ("TEXT" "PLAIN" ("CHARSET" "utf-8" "NAME" {8}) NIL "a \\"q\\"" "8BIT" 5 1))'
+    assert _parse_fetch_list(text, [b'r\xc3\xa9sum\xc3\xa9']) == [b'1', [
+        b'UID', b'3', b'BODYSTRUCTURE',
+        [b'TEXT', b'PLAIN', [b'CHARSET', b'utf-8', b'NAME', b'r\xc3\xa9sum\xc3\xa9'], None, b'a "q"', b'8BIT', b'5', b'1'],
+    ]]
+
+
+def test_parse_fetch_list_tolerates_unbalanced_parens():
+    assert _parse_fetch_list(b'1 (UID 3))) {2}', []) == [b'1', [b'UID', b'3'], b'']
+
+
+class DroppedIMAP:
+    """A session the server has already closed: every command aborts."""
+
+    def noop(self):
+        raise imaplib.IMAP4.abort('socket error: EOF')
+
+    def logout(self):
+        raise imaplib.IMAP4.abort('socket error: EOF')
+
+
+def test_failed_login_is_retried_on_next_call(imap_logins):
+    imap_logins['messages'] = [RAW_UTF8_MESSAGE]
+    agent = ImapAgent('me@example.com', 'secret', 'imap.example.com')
+    imap_logins['fail'] = True
+    with pytest.raises(imaplib.IMAP4.error):
+        agent.fetch_headers()
+    assert agent.mail is None
+    imap_logins['fail'] = False
+    assert [h['subject'] for h in agent.fetch_headers()] == ['Grüße']
+
+
+def test_dropped_session_reconnects(imap_logins):
+    imap_logins['messages'] = [RAW_UTF8_MESSAGE]
+    agent = ImapAgent('me@example.com', 'secret', 'imap.example.com')
+    agent.mail = DroppedIMAP()
+    assert [h['subject'] for h in agent.fetch_headers()] == ['Grüße']
+    assert imap_logins['connections'] == 1
+
+
+def test_logout_of_dropped_session_clears_it(imap_logins):
+    agent = ImapAgent('me@example.com', 'secret', 'imap.example.com')
+    agent.mail = DroppedIMAP()
+    with pytest.raises(KeyError):
+        with agent:
+            agent.mail = DroppedIMAP()
+            raise KeyError('original error')
+    assert agent.mail is None
+
+
+def test_download_mail_json_save_replaces_file(imap_agent, tmp_path):
+    agent = imap_agent(RAW_UTF8_MESSAGE)
+    text = agent.download_mail_json(save=True, path=f'{tmp_path}/')
+    assert (tmp_path / 'mail.json').read_text(encoding='utf-8') == text
+    assert [p.name for p in tmp_path.iterdir()] == ['mail.json']
+
+
+def test_download_mail_json_failure_keeps_previous_file(imap_agent, tmp_path, monkeypatch):
+    (tmp_path / 'mail.json').write_text('[{"old":1}]', encoding='utf-8')
+    agent = imap_agent(RAW_UTF8_MESSAGE)
+
+    def dropped(*args):
+        raise imaplib.IMAP4.abort('socket error: EOF')
+
+    monkeypatch.setattr(agent.mail, 'uid', dropped)
+    with pytest.raises(imaplib.IMAP4.abort):
+        agent.download_mail_json(save=True, path=f'{tmp_path}/')
+    assert (tmp_path / 'mail.json').read_text(encoding='utf-8') == '[{"old":1}]'
+    assert [p.name for p in tmp_path.iterdir()] == ['mail.json']
+
+
+def _structure(text: bytes, literals=()):
+    """Parse the list following BODYSTRUCTURE in a ``1 (UID 1 BODYSTRUCTURE (...))`` response."""
+    return _parse_fetch_list(b'1 (UID 1 BODYSTRUCTURE ' + text + b')', list(literals))[1][3]
+
+
+ENVELOPE = b'(NIL "inner" NIL NIL NIL NIL NIL NIL NIL NIL)'
+
+
+@pytest.mark.parametrize('inner, section', [
+    (b'("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "7BIT" 5 1)', '2.1'),
+    (b'(("TEXT" "HTML" NIL NIL NIL "7BIT" 5 1)("TEXT" "PLAIN" NIL NIL NIL "BASE64" 8 1) "ALTERNATIVE")', '2.2'),
+])
+def test_find_text_plain_inside_attached_message(inner, section):
+    structure = _structure(
+        b'(("TEXT" "HTML" NIL NIL NIL "7BIT" 5 1)'
+        b'("MESSAGE" "RFC822" NIL NIL NIL "7BIT" 90 ' + ENVELOPE + b' ' + inner + b' 4) "MIXED")')
+    assert _find_text_plain(structure)[0] == section
+
+
+MIXED_MESSAGE = StructuredMessage(
+    raw=(b'From: a@example.com\nSubject: report\nContent-Type: multipart/mixed; boundary=x\n\n'
+         b'--x\n...\n--x--\n'),
+    # multipart/mixed: multipart/alternative (plain 1.1, html 1.2) and a PDF whose
+    # non-ASCII name the server sends as a literal.
+    structure=[
+        (b'((("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "BASE64" 24 1)'
+         b'("TEXT" "HTML" ("CHARSET" "utf-8") NIL NIL "7BIT" 11 1) "ALTERNATIVE")'
+         b'("APPLICATION" "PDF" ("NAME" {11}', 'résumé.pdf'.encode('utf-8')),
+        b') NIL NIL "BASE64" 8) "MIXED")',
+    ],
+    sections={
+        '1.1': base64.encodebytes('Grüße aus Köln\n'.encode('utf-8')),
+        '1.2': b'<p>html</p>',
+        '2': b'JVBERi0=',
+    },
+)
+
+
+def test_find_text_plain_numbers_nested_multipart_sections():
+    structure = _parse_fetch_list(
+        b'1 (UID 1 BODYSTRUCTURE ' + MIXED_MESSAGE.structure[0][0] + MIXED_MESSAGE.structure[1] + b')',
+        [MIXED_MESSAGE.structure[0][1]])[1][3]
+    assert structure[1][2] == [b'NAME', 'résumé.pdf'.encode('utf-8')]
+    assert _find_text_plain(structure) == ('1.1', 'utf-8', b'BASE64')
+
+
+def test_download_mail_json_fetches_only_the_text_section(imap_agent):
+    agent = imap_agent(MIXED_MESSAGE)
+    [record] = json.loads(agent.download_mail_json())
+    assert record['subject'] == 'report'
+    assert record['body'] == 'Grüße aus Köln\n'
+    specs = [command[2] for command in agent.mail.commands if command[0] == 'fetch']
+    assert '(UID BODY.PEEK[1.1])' in specs
+    assert not any('RFC822' in spec or 'BODY.PEEK[2]' in spec or 'BODY.PEEK[]' in spec for spec in specs)
+
+
+@pytest.mark.parametrize('payload, encoding, expected', [
+    (b'R3LDvMOfZQ==\n', b'BASE64', 'Grüße'.encode('utf-8')),
+    (b'Gr=C3=BC=C3=9Fe=\n', b'quoted-printable', 'Grüße'.encode('utf-8')),
+    (b'plain', b'7BIT', b'plain'),
+    (b'plain', None, b'plain'),
+    (b'abc', b'BASE64', b'abc'),  # bad padding: kept as is
+])
+def test_decode_transfer(payload, encoding, expected):
+    assert _decode_transfer(payload, encoding) == expected
+
+
+def test_unreadable_structure_falls_back_to_peeked_full_message(imap_agent):
+    agent = imap_agent(StructuredMessage(raw=RAW_UTF8_MESSAGE, structure=b'("TEXT")', sections={}))
+    [record] = json.loads(agent.download_mail_json())
+    assert record['subject'] == 'Grüße'
+    assert record['body'].strip() == 'Hallo Welt'
+    assert ('fetch', b'1', '(UID BODY.PEEK[])') in agent.mail.commands
+
+
+def test_missing_text_section_is_logged(imap_agent, caplog):
+    # The structure points at section 1, but the server returns nothing for it.
+    agent = imap_agent(
+        StructuredMessage(raw=RAW_UTF8_MESSAGE, structure=b'("TEXT" "PLAIN" NIL NIL NIL "7BIT" 5 1)', sections={}),
+        RAW_UTF8_MESSAGE)
+    with caplog.at_level(logging.WARNING, logger='MailToolsBox.imapClient'):
+        assert len(json.loads(agent.download_mail_json())) == 1
+    assert 'No text/plain section returned for UIDs 1' in caplog.text
+
+
+@pytest.mark.parametrize('method', ['download_mail_text', 'download_mail_json', 'download_mail_msg', 'fetch_headers'])
+@pytest.mark.parametrize('batch_size', [0, -1])
+def test_download_rejects_non_positive_batch_size(imap_agent, tmp_path, method, batch_size):
+    agent = imap_agent(RAW_UTF8_MESSAGE)
+    kwargs = {'path': f'{tmp_path}/'} if method in ('download_mail_text', 'download_mail_msg') else {}
+    with pytest.raises(ValueError, match='batch_size'):
+        getattr(agent, method)(batch_size=batch_size, **kwargs)
+    assert agent.mail.commands == []
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_out_of_range_date_is_blank(imap_agent):
+    agent = imap_agent(b'Date: Fri, 31 Dec 9999 23:59:59 -0100\nSubject: s\n\nbody\n', RAW_UTF8_MESSAGE)
+    assert agent.fetch_headers()[0]['local_message_date'] == ''
+    assert len(json.loads(agent.download_mail_json())) == 2
+
+
+# CRLF line endings, 8-bit bytes and an odd folded header must survive unchanged.
+RAW_BYTES_MESSAGE = b'Subject: caf\xc3\xa9\r\nX-Folded: one\r\n\ttwo\r\n\r\nbody \xff\r\n'
+
+
+def test_download_mail_msg_writes_raw_bytes(imap_agent, tmp_path):
+    agent = imap_agent(RAW_BYTES_MESSAGE, RAW_UTF8_MESSAGE)
+    agent.download_mail_msg(path=f'{tmp_path}/')
+    assert (tmp_path / 'email_0.msg').read_bytes() == RAW_BYTES_MESSAGE
+    assert (tmp_path / 'email_1.msg').read_bytes() == RAW_UTF8_MESSAGE
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['email_0.msg', 'email_1.msg']
+
+
+def test_download_mail_msg_archive(imap_agent, tmp_path):
+    agent = imap_agent(RAW_BYTES_MESSAGE, RAW_UTF8_MESSAGE)
+    agent.download_mail_msg(path=f'{tmp_path}/', archive=True)
+    assert [p.name for p in tmp_path.iterdir()] == ['mail.tar']
+    with tarfile.open(tmp_path / 'mail.tar') as tar:
+        members = tar.getmembers()
+        assert [(m.name, m.size) for m in members] == [
+            ('email_0.msg', len(RAW_BYTES_MESSAGE)), ('email_1.msg', len(RAW_UTF8_MESSAGE))]
+        assert [tar.extractfile(m).read() for m in members] == [RAW_BYTES_MESSAGE, RAW_UTF8_MESSAGE]
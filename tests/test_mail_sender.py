@@ -0,0 +1,289 @@
+import math
+import smtplib
+import ssl
+
+import jinja2
+import pytest
+
+from MailToolsBox import mailSender
+from MailToolsBox.mailSender import EmailSender, SendAgent, _RateLimiter
+
+
+def make_sender():
+    return EmailSender('me@example.com', 'smtp.example.com', 'secret')
+
+
+def test_send_bulk_records_smtp_errors_per_batch(smtp_server):
+    smtp_server.errors = {
+        'a@example.com': smtplib.SMTPNotSupportedError('SMTPUTF8 not supported'),
+        'b@example.com': smtplib.SMTPResponseException(451, b'try later'),
+    }
+    failed = make_sender().send_bulk(
+        ['a@example.com', 'b@example.com', 'c@example.com'], 'Hi', 'Body')
+    assert set(failed) == {'a@example.com', 'b@example.com'}
+    assert [to for _, to, _, _ in smtp_server.sent] == [['c@example.com']]
+
+
+def test_send_bulk_survives_repeated_disconnect(smtp_server):
+    smtp_server.errors = {'a@example.com': smtplib.SMTPServerDisconnected('gone')}
+    failed = make_sender().send_bulk(['a@example.com', 'b@example.com'], 'Hi', 'Body')
+    assert list(failed) == ['a@example.com']
+    assert [to for _, to, _, _ in smtp_server.sent] == [['b@example.com']]
+
+
+def test_send_bulk_internationalized_address_uses_smtputf8(smtp_server):
+    smtp_server.extensions = ('smtputf8',)
+    sender = EmailSender('me@example.com', 'smtp.example.com', 'secret', validate_emails=False)
+    assert sender.send_bulk(['jö@exämple.com'], 'Grüße', 'Body') == {}
+    [(_, to_addrs, raw, options)] = smtp_server.sent
+    assert to_addrs == ['jö@exämple.com']
+    assert 'SMTPUTF8' in options
+    assert 'To: jö@exämple.com\r\n'.encode('utf-8') in raw
+
+
+def test_send_bulk_internationalized_address_without_smtputf8(smtp_server):
+    sender = EmailSender('me@example.com', 'smtp.example.com', 'secret', validate_emails=False)
+    failed = sender.send_bulk(['jö@exämple.com', 'a@example.com'], 'Hi', 'Body')
+    assert list(failed) == ['jö@exämple.com']
+    assert [to for _, to, _, _ in smtp_server.sent] == [['a@example.com']]
+
+
+def test_send_bulk_rejects_header_injection_without_validation(smtp_server):
+    sender = EmailSender('me@example.com', 'smtp.example.com', 'secret', validate_emails=False)
+    evil = 'a@example.com\r\nBcc: evil@example.com'
+    failed = sender.send_bulk([evil, 'b@example.com'], 'Hi', 'Body')
+    assert list(failed) == [evil]
+    assert [to for _, to, _, _ in smtp_server.sent] == [['b@example.com']]
+    assert b'evil' not in smtp_server.sent[0][2]
+
+
+@pytest.mark.parametrize('option', ['batch_size', 'concurrency', 'messages_per_connection'])
+@pytest.mark.parametrize('value', [0, -1])
+def test_send_bulk_rejects_non_positive_sizes(smtp_server, option, value):
+    with pytest.raises(ValueError, match=option):
+        make_sender().send_bulk(['a@example.com'], 'Hi', 'Body', **{option: value})
+    assert smtp_server.sent == []
+
+
+def test_custom_ssl_context_is_used_for_starttls(smtp_server, monkeypatch):
+    contexts = []
+    monkeypatch.setattr(smtp_server, 'starttls', lambda self, context=None: contexts.append(context))
+    context = ssl.create_default_context()
+    sender = EmailSender('me@example.com', 'smtp.example.com', 'secret', ssl_context=context)
+    sender.send(['a@example.com'], 'Hi', 'Body')
+    make_sender().send(['a@example.com'], 'Hi', 'Body')
+    assert contexts[0] is context
+    assert contexts[1] is not context
+
+
+def test_ssl_context_can_be_tuned_in_place(smtp_server, monkeypatch):
+    contexts = []
+    monkeypatch.setattr(smtp_server, 'starttls', lambda self, context=None: contexts.append(context))
+    sender, other = make_sender(), make_sender()
+    assert isinstance(sender.ssl_context, ssl.SSLContext)
+    sender.ssl_context.minimum_version = ssl.TLSVersion.TLSv1_3
+    sender.send(['a@example.com'], 'Hi', 'Body')
+    other.send(['a@example.com'], 'Hi', 'Body')
+    assert contexts[0] is sender.ssl_context
+    assert contexts[1].minimum_version != ssl.TLSVersion.TLSv1_3
+
+
+def test_send_on_open_session_rejects_other_tls_mode(smtp_server):
+    sender = make_sender().open(use_tls=False)
+    try:
+        sender.send(['a@example.com'], 'Hi', 'Body', use_tls=False)
+        with pytest.raises(ValueError, match='use_tls'):
+            sender.send(['a@example.com'], 'Hi', 'Body')
+    finally:
+        sender.close()
+    assert len(smtp_server.sent) == 1
+
+
+def test_send_bulk_reports_unsent_when_reconnect_fails(smtp_server):
+    smtp_server.max_connections = 1
+    recipients = ['a@example.com', 'b@example.com', 'c@example.com']
+    failed = make_sender().send_bulk(recipients, 'Hi', 'Body', messages_per_connection=1)
+    assert [to for _, to, _, _ in smtp_server.sent] == [['a@example.com']]
+    assert list(failed) == ['b@example.com', 'c@example.com']
+    assert 'refused' in failed['b@example.com']
+
+
+def test_send_bulk_reports_everyone_when_server_unreachable(smtp_server):
+    smtp_server.max_connections = 0
+    failed = make_sender().send_bulk(['a@example.com', 'b@example.com'], 'Hi', 'Body')
+    assert list(failed) == ['a@example.com', 'b@example.com']
+
+
+def test_send_bulk_socket_error_fails_batch_and_reconnects(smtp_server):
+    smtp_server.errors = {'a@example.com': TimeoutError('timed out')}
+    failed = make_sender().send_bulk(['a@example.com', 'b@example.com'], 'Hi', 'Body')
+    assert list(failed) == ['a@example.com']
+    assert [to for _, to, _, _ in smtp_server.sent] == [['b@example.com']]
+    assert smtp_server.connections == 2
+
+
+@pytest.mark.parametrize('count, batch_size', [(10, 3), (9, 3), (1, 50), (120, 50)])
+def test_send_bulk_batched_single_transaction(smtp_server, count, batch_size):
+    recipients = [f'user{i}@example.com' for i in range(count)]
+    assert make_sender().send_bulk(recipients, 'Hi', 'Body', batch_size=batch_size) == {}
+    assert len(smtp_server.sent) == math.ceil(count / batch_size)
+    assert [to for _, batch, _, _ in smtp_server.sent for to in batch] == recipients
+
+
+def test_send_bulk_batch_hides_recipients(smtp_server):
+    make_sender().send_bulk(['a@example.com', 'b@example.com', 'c@example.com'], 'Hi', 'Body', batch_size=2)
+    first, second = (raw for _, _, raw, _ in smtp_server.sent)
+    assert first.startswith(b'To: undisclosed-recipients:;\r\n')
+    assert b'a@example.com' not in first and b'b@example.com' not in first
+    assert second.startswith(b'To: c@example.com\r\n')
+
+
+def test_send_bulk_batch_reports_refused_addresses(smtp_server):
+    smtp_server.refused = {'b@example.com': (550, b'No such user')}
+    failed = make_sender().send_bulk(['a@example.com', 'b@example.com', 'c@example.com'], 'Hi', 'Body',
+                                     batch_size=3)
+    assert list(failed) == ['b@example.com']
+    assert 'No such user' in failed['b@example.com']
+    assert [to for _, to, _, _ in smtp_server.sent] == [['a@example.com', 'c@example.com']]
+
+
+def test_send_bulk_template_renders_once(smtp_server, monkeypatch):
+    renders = []
+    original_render = jinja2.Template.render
+
+    def counting_render(self, *args, **kwargs):
+        renders.append(kwargs)
+        return original_render(self, *args, **kwargs)
+
+    monkeypatch.setattr(jinja2.Template, 'render', counting_render)
+    sender = make_sender()
+    sender.template_env.loader = jinja2.DictLoader({'news.html': '<p>Hello {{ name }}</p>'})
+    recipients = [f'user{i}@example.com' for i in range(100)]
+    assert sender.send_bulk_template(recipients, 'News', 'news.html', {'name': 'World'}) == {}
+    assert renders == [{'name': 'World'}]
+    assert len(smtp_server.sent) == 100
+    assert all(b'<p>Hello World</p>' in raw and b'text/html' in raw for _, _, raw, _ in smtp_server.sent)
+
+
+def test_open_session_connects_once_across_sends(smtp_server):
+    with make_sender() as sender:
+        for i in range(3):
+            sender.send([f'user{i}@example.com'], 'Hi', 'Body')
+        session = sender._smtp
+    assert smtp_server.connections == 1
+    assert len(smtp_server.sent) == 3
+    assert session.closed and sender._smtp is None
+
+
+def test_open_session_reconnects_once_after_disconnect(smtp_server, monkeypatch):
+    send_message = smtp_server.send_message
+
+    def drop_first_connection(self, msg, from_addr=None, to_addrs=None):
+        if smtp_server.connections == 1:
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        return send_message(self, msg, from_addr, to_addrs)
+
+    monkeypatch.setattr(smtp_server, 'send_message', drop_first_connection)
+    with make_sender() as sender:
+        sender.send(['a@example.com'], 'Hi', 'Body')
+        sender.send(['b@example.com'], 'Hi', 'Body')
+    assert smtp_server.connections == 2
+    assert [msg['To'] for _, _, msg, _ in smtp_server.sent] == ['a@example.com', 'b@example.com']
+
+
+def test_send_agent_server_quit_closes_session(smtp_server):
+    agent = SendAgent('me@example.com', 'smtp.example.com', 'secret').open()
+    session = agent._smtp
+    agent.send_mail(['a@example.com'], 'Hi', 'Body', server_quit=True)
+    assert session.closed and agent._smtp is None
+    assert smtp_server.connections == 1
+
+
+def test_open_session_gives_up_after_one_reconnect(smtp_server, monkeypatch):
+    def always_drop(self, msg, from_addr=None, to_addrs=None):
+        raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+
+    monkeypatch.setattr(smtp_server, 'send_message', always_drop)
+    with make_sender() as sender:
+        with pytest.raises(smtplib.SMTPServerDisconnected):
+            sender.send(['a@example.com'], 'Hi', 'Body')
+    assert smtp_server.connections == 2
+
+
+def test_send_bulk_concurrency_merges_worker_results(smtp_server):
+    recipients = [f'user{i}@example.com' for i in range(10)]
+    smtp_server.errors = {recipients[1]: smtplib.SMTPDataError(554, b'rejected'),
+                          recipients[5]: smtplib.SMTPDataError(554, b'rejected')}
+    failed = make_sender().send_bulk(recipients, 'Hi', 'Body', concurrency=3)
+    assert set(failed) == {recipients[1], recipients[5]}
+    assert sorted(to for _, [to], _, _ in smtp_server.sent) == sorted(set(recipients) - set(failed))
+    assert smtp_server.connections == 3
+
+
+def test_send_bulk_concurrency_above_recipient_count(smtp_server):
+    assert make_sender().send_bulk(['a@example.com', 'b@example.com'], 'Hi', 'Body', concurrency=8) == {}
+    assert smtp_server.connections == 2
+
+
+def test_send_bulk_recycles_connection(smtp_server):
+    recipients = [f'user{i}@example.com' for i in range(5)]
+    assert make_sender().send_bulk(recipients, 'Hi', 'Body', messages_per_connection=2) == {}
+    assert smtp_server.connections == 3
+    assert [to for _, [to], _, _ in smtp_server.sent] == recipients
+
+
+@pytest.mark.parametrize('rate', [0, -5])
+def test_send_bulk_rejects_non_positive_rate(smtp_server, rate):
+    with pytest.raises(ValueError, match='rate_per_sec'):
+        make_sender().send_bulk(['a@example.com'], 'Hi', 'Body', rate_per_sec=rate)
+    assert smtp_server.sent == []
+
+
+@pytest.fixture
+def fake_clock(monkeypatch):
+    """Freeze time.monotonic; time.sleep advances it and records each delay."""
+    clock = {'now': 100.0, 'sleeps': []}
+
+    def sleep(delay):
+        clock['sleeps'].append(round(delay, 6))
+        clock['now'] += delay
+
+    monkeypatch.setattr(mailSender.time, 'monotonic', lambda: clock['now'])
+    monkeypatch.setattr(mailSender.time, 'sleep', sleep)
+    return clock
+
+
+def test_rate_limiter_spaces_calls(fake_clock):
+    limiter = _RateLimiter(4)
+    for _ in range(4):
+        limiter.wait()
+    assert fake_clock['sleeps'] == [0.25, 0.25, 0.25]
+    assert fake_clock['now'] == pytest.approx(100.75)
+
+
+def test_rate_limiter_does_not_bank_idle_time(fake_clock):
+    limiter = _RateLimiter(2)
+    limiter.wait()
+    fake_clock['now'] += 10
+    limiter.wait()
+    limiter.wait()
+    assert fake_clock['sleeps'] == [0.5]
+
+
+def test_send_bulk_rate_limit_is_shared_by_workers(smtp_server, monkeypatch):
+    limiters = []
+    monkeypatch.setattr(_RateLimiter, 'wait', lambda self: limiters.append(self))
+    recipients = [f'user{i}@example.com' for i in range(6)]
+    assert make_sender().send_bulk(recipients, 'Hi', 'Body', concurrency=3, rate_per_sec=10) == {}
+    assert len(limiters) == 6
+    assert len(set(map(id, limiters))) == 1
+
+
+def test_send_bulk_refreshes_date_after_a_minute(smtp_server, fake_clock, monkeypatch):
+    dates = iter(['Mon, 01 Jan 2024 10:00:00 +0000', 'Mon, 01 Jan 2024 10:01:20 +0000'])
+    monkeypatch.setattr(mailSender, 'formatdate', lambda localtime=False: next(dates))
+    recipients = ['a@example.com', 'b@example.com', 'c@example.com']
+    # 40 s between sends: the third message goes out 80 s after the first.
+    assert make_sender().send_bulk(recipients, 'Hi', 'Body', rate_per_sec=1 / 40) == {}
+    stamps = [raw.split(b'Date: ')[1].split(b'\r\n')[0] for _, _, raw, _ in smtp_server.sent]
+    assert stamps == [b'Mon, 01 Jan 2024 10:00:00 +0000'] * 2 + [b'Mon, 01 Jan 2024 10:01:20 +0000']